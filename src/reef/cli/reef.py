@@ -24,6 +24,10 @@ GROUP_VARS_FILE = INVENTORY_DIR / "group_vars" / "all.yml"
 HOSTS_INI_FILE = INVENTORY_DIR / "hosts.ini"
 SCRIPTS_DIR = BASE_DIR / "scripts"
 
+# Admin password as written by the wazuh-indexer role; compiled once since the
+# password file can be scanned after every deployment
+_INDEXER_PW_RE = re.compile(r"indexer_username:\s*'admin'.*?indexer_password:\s*'([^']+)'", re.DOTALL)
+
 def run_command(command, cwd=BASE_DIR, quiet=False):
     """
     Run a shell command.
@@ -403,30 +407,29 @@ def get_inventory_hosts():
 
     hosts = []
     try:
-        with open(HOSTS_INI_FILE, 'r') as f:
-            lines = f.readlines()
-
         current_section = None
         ip_pattern = re.compile(r'^(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})(\s+.*)?$')
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('[') and line.endswith(']'):
-                current_section = line
-                continue
-            
-            if current_section in ['[security_server]', '[agents]']:
-                match = ip_pattern.match(line)
-                if match:
-                    ip = match.group(1)
-                    rest = match.group(2) or ""
-                    user = "root" # Default
-                    
-                    user_match = re.search(r'ansible_user=(\S+)', rest)
-                    if user_match:
-                        user = user_match.group(1)
-                    
-                    hosts.append({'ip': ip, 'user': user})
+
+        # Iterate the handle directly: no whole-file copy plus line list
+        with open(HOSTS_INI_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('[') and line.endswith(']'):
+                    current_section = line
+                    continue
+
+                if current_section in ['[security_server]', '[agents]']:
+                    match = ip_pattern.match(line)
+                    if match:
+                        ip = match.group(1)
+                        rest = match.group(2) or ""
+                        user = "root" # Default
+
+                        user_match = re.search(r'ansible_user=(\S+)', rest)
+                        if user_match:
+                            user = user_match.group(1)
+
+                        hosts.append({'ip': ip, 'user': user})
     except Exception as e:
         console.print(f"[red]Error parsing inventory:[/red] {e}")
         return []
@@ -877,7 +880,7 @@ def show_post_deployment_msg():
             # Check if file contains the key-value structure or just the password
             if "indexer_username" in content:
                 # Regex to find admin password in the provided format
-                match = re.search(r"indexer_username:\s*'admin'.*?indexer_password:\s*'([^']+)'", content, re.DOTALL)
+                match = _INDEXER_PW_RE.search(content)
                 if match:
                     password = match.group(1)
                 else:
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 from nicegui import ui
@@ -18,14 +19,17 @@ from reef.manager.ui.documentation import show_documentation
 
 # --- App Layout & State ---
 
+# Global style, registered once per process instead of per page handler call
+ui.add_head_html("""
+<style>
+    body { background: linear-gradient(135deg, #0f172a 0%, #1e1b4b 100%); }
+    /* Let the browser skip layout/paint for cards below the fold */
+    .reef-card { content-visibility: auto; contain-intrinsic-size: 400px 600px; }
+</style>
+""", shared=True)
+
 @ui.page('/')
 def main_page():
-    # Global Style
-    ui.add_head_html("""
-    <style>
-        body { background: linear-gradient(135deg, #0f172a 0%, #1e1b4b 100%); }
-    </style>
-    """)
     ui.colors(primary='#4f46e5', secondary='#06b6d4', accent='#111827', dark='#111827')
        
     # Sidebar
@@ -81,9 +85,6 @@ def main_page():
     navigate('Dashboard', show_dashboard)
 
 def run_app():
-    import os
-    import socket
-    
     env_host = os.environ.get('REEF_HOST')
     env_port = os.environ.get('REEF_PORT')
     
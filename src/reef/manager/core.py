@@ -1,3 +1,4 @@
+import functools
 import os
 import subprocess
 import sys
@@ -147,16 +148,20 @@ class SchemaManager:
         return True, value
 
 def load_current_config():
-    """Load current values from group_vars/all.yml"""
-    yaml = YAML()
+    """Load current values from group_vars/all.yml (parse cached against mtime)."""
     if GROUP_VARS_FILE.exists():
         try:
-            with open(GROUP_VARS_FILE, 'r') as f:
-                return yaml.load(f) or {}
+            return _load_config_cached(str(GROUP_VARS_FILE), GROUP_VARS_FILE.stat().st_mtime_ns)
         except:
             pass
     return {}
 
+@functools.lru_cache(maxsize=1)
+def _load_config_cached(path_str, mtime_ns):
+    yaml = YAML()
+    with open(path_str, 'r') as f:
+        return yaml.load(f) or {}
+
 def update_yaml_config_from_schema(config_data):
     """Update ansible/inventory/group_vars/all.yml preserving comments."""
     yaml = YAML()
@@ -179,10 +184,15 @@ def update_yaml_config_from_schema(config_data):
 
         with open(GROUP_VARS_FILE, 'w') as f:
             yaml.dump(data, f)
-        
+
+        _load_config_cached.cache_clear()
         console.print(f"[green]Successfully updated {GROUP_VARS_FILE}[/green]")
         return True
     except Exception as e:
+        # Drop the cache here too: a caller may have mutated the cached dict
+        # before a failed write, and the unchanged file mtime would otherwise
+        # keep serving that never-persisted state
+        _load_config_cached.cache_clear()
         console.print(f"[bold red]Failed to update YAML config:[/bold red] {e}")
         return False
 
@@ -242,6 +252,85 @@ def update_ini_inventory(manager_ip, manager_user, manager_password, manager_key
         console.print(f"[bold red]Failed to update INI inventory:[/bold red] {e}")
         return False
 
+def parse_hosts_ini():
+    """
+    Parse hosts.ini into {section_name: [ip, ...]}.
+    Cached against the file's mtime so repeated page renders reuse one parse.
+    Returns an empty dict if the file does not exist or cannot be parsed.
+    """
+    if not HOSTS_INI_FILE.exists():
+        return {}
+    try:
+        return _parse_hosts_ini(str(HOSTS_INI_FILE), HOSTS_INI_FILE.stat().st_mtime_ns)
+    except Exception:
+        return {} # Malformed inventory (e.g. content before the first section)
+
+def parse_hosts_ini_entries():
+    """
+    Parse hosts.ini into {section_name: [{'ip', 'user', 'password', 'key'}]}.
+    Shares the cached token parse with parse_hosts_ini, so rendering both the
+    host lists and the credential forms costs one file read.
+    Returns an empty dict if the file does not exist or cannot be parsed.
+    """
+    if not HOSTS_INI_FILE.exists():
+        return {}
+    try:
+        return _parse_hosts_ini_entries(str(HOSTS_INI_FILE), HOSTS_INI_FILE.stat().st_mtime_ns)
+    except Exception:
+        return {} # Malformed inventory (e.g. content before the first section)
+
+@functools.lru_cache(maxsize=4)
+def _parse_hosts_ini(path_str, mtime_ns):
+    # IP-only view derived from the full-entry parse: one file read serves both
+    entries = _parse_hosts_ini_entries(path_str, mtime_ns)
+    return {section: [e['ip'] for e in items] for section, items in entries.items()}
+
+@functools.lru_cache(maxsize=4)
+def _parse_hosts_ini_entries(path_str, mtime_ns):
+    # Space delimiter splits "ip ansible_vars..." into key/value, mirroring
+    # how update_ini_inventory writes the file
+    config = configparser.RawConfigParser(delimiters=(' ',), allow_no_value=True, strict=False)
+    config.optionxform = str  # keep IPs verbatim, no lowercasing
+    # utf-8-sig: a BOM from a Windows editor would otherwise be glued to the
+    # first section header and trip configparser
+    with open(path_str, 'r', encoding='utf-8-sig') as fh:
+        config.read_file(fh)
+
+    sections = {}
+    for section in config.sections():
+        entries = []
+        for ip, vars_str in config.items(section):
+            entry = {'ip': ip, 'user': 'root', 'password': '', 'key': ''}
+            for tok in (vars_str or '').split():
+                if tok.startswith('ansible_user='):
+                    entry['user'] = tok.split('=', 1)[1]
+                elif tok.startswith(('ansible_ssh_pass=', 'ansible_password=')):
+                    entry['password'] = tok.split('=', 1)[1]
+                elif tok.startswith('ansible_ssh_private_key_file='):
+                    entry['key'] = tok.split('=', 1)[1]
+            entries.append(entry)
+        sections[section] = entries
+    return sections
+
+def list_roles():
+    """
+    List role directory names under ansible/roles, sorted.
+    Cached against the directory's mtime so repeated page renders reuse one
+    scan. Returns an empty list if the directory does not exist.
+    """
+    roles_dir = ANSIBLE_DIR / "roles"
+    try:
+        mtime_ns = roles_dir.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    return _list_roles(str(roles_dir), mtime_ns)
+
+@functools.lru_cache(maxsize=1)
+def _list_roles(path_str, mtime_ns):
+    # DirEntry.is_dir reads d_type from getdents: no stat per entry
+    with os.scandir(path_str) as it:
+        return sorted(e.name for e in it if e.is_dir(follow_symlinks=False))
+
 def get_inventory_hosts():
     """
     Parse hosts.ini to find all configured hosts.
@@ -255,8 +344,8 @@ def get_inventory_hosts():
     hosts = []
     
     try:
-        config.read(HOSTS_INI_FILE)
-        
+        config.read(HOSTS_INI_FILE, encoding='utf-8')
+
         def parse_section(section_name):
             if section_name not in config:
                 return
@@ -1,19 +1,90 @@
+import asyncio
 import httpx
-import datetime
+import json
+import time
 from pathlib import Path
 from fpdf import FPDF
+from nicegui import app
 from reef.manager.core import load_current_config
 
 WAZUH_PASSWORD_FILE = Path(__file__).parent.parent / "ansible" / "inventory" / "wazuh-admin-password.txt"
 
+# One shared client: connections (TCP + TLS) are kept alive between report
+# fetches instead of being re-established per call
+_client = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(verify=False, timeout=10.0,
+                                    limits=httpx.Limits(max_keepalive_connections=8))
+    return _client
+
+async def _close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+app.on_shutdown(_close_client)
+
+# Report palette
+COLOR_PRIMARY = (15, 23, 42) # Slate 900
+COLOR_SECONDARY = (100, 116, 139) # Slate 500
+COLOR_ACCENT = (14, 165, 233) # Sky 500
+COLOR_DANGER = (239, 68, 68) # Red 500
+COLOR_WARNING = (245, 158, 11) # Amber 500
+COLOR_SUCCESS = (16, 185, 129) # Emerald 500
+
+# Agent-row rendering: label and color per agent status, one lookup per row
+_AGENT_STATUS_MAP = {
+    "active": ("Sous Surveillance", COLOR_SUCCESS),
+}
+_AGENT_STATUS_DEFAULT = ("Inconnu", COLOR_SECONDARY)
+
+def _make_color_setter(pdf):
+    """set_text_color wrapper that skips writes when the color is unchanged,
+    so row loops don't re-emit identical PDF state for every cell."""
+    last = [None]
+
+    def set_color(rgb):
+        if rgb != last[0]:
+            pdf.set_text_color(*rgb)
+            last[0] = rgb
+
+    return set_color
+
+# Summary bucket per rule level: 0-4 light, 5-9 moderate, 10-12 severe,
+# 13 and up critical (indexed with min(level, 13))
+_LEVEL_TO_BUCKET = ('light',) * 5 + ('moderate',) * 5 + ('severe',) * 3 + ('critical',)
+
+# Credentials only change when a deployment rewrites the password file, so
+# a short TTL plus an mtime check spares the config and password reads that
+# otherwise happen on every report fetch
+_CRED_CACHE = {'mtime': None, 'val': None, 'ts': 0.0}
+_CRED_TTL = 60.0
+
 def get_wazuh_credentials():
+    try:
+        mtime = WAZUH_PASSWORD_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    now = time.monotonic()
+    if (_CRED_CACHE['val'] is not None
+            and _CRED_CACHE['mtime'] == mtime
+            and now - _CRED_CACHE['ts'] < _CRED_TTL):
+        return _CRED_CACHE['val']
+
     config = load_current_config()
     manager_ip = config.get('wazuh_manager_ip', '127.0.0.1')
     user = 'admin'
     password = ''
-    if WAZUH_PASSWORD_FILE.exists():
+    if mtime is not None:
         password = WAZUH_PASSWORD_FILE.read_text().strip()
-    return manager_ip, user, password
+    _CRED_CACHE['mtime'] = mtime
+    _CRED_CACHE['val'] = (manager_ip, user, password)
+    _CRED_CACHE['ts'] = now
+    return _CRED_CACHE['val']
 
 
 
@@ -35,145 +106,153 @@ async def fetch_wazuh_alert_summary(time_range="now-24h"):
     }
 
     indexer_url = f"https://{manager_ip}:9200/wazuh-alerts-*/_search"
+    msearch_url = f"https://{manager_ip}:9200/wazuh-alerts-*/_msearch"
 
-    async with httpx.AsyncClient(verify=False, timeout=10.0) as client:
+    client = _get_client()
         
-        # 1. Summary Query
-        summary_query = {
-            "size": 0,
-            "query": {
-                "range": {
-                    "@timestamp": {
-                        "gte": time_range
-                    }
+    # 1+2. Summary and top-alerts aggregations
+    summary_query = {
+        "size": 0,
+        # The UI only shows the total; a 10k cap lets ES early-terminate counting
+        "track_total_hits": 10000,
+        "query": {
+            "range": {
+                "@timestamp": {
+                    "gte": time_range
                 }
-            },
-            "aggs": {
-                "severity_levels": {
-                    "terms": {
-                        "field": "rule.level",
-                        "size": 20
-                    }
+            }
+        },
+        "aggs": {
+            "severity_levels": {
+                "terms": {
+                    "field": "rule.level",
+                    "size": 20
                 }
             }
         }
+    }
         
-        try:
-            resp_summary = await client.post(indexer_url, json=summary_query, auth=(user, password))
-            if resp_summary.status_code == 200:
-                s_data = resp_summary.json()
-                data_out["summary"]['total'] = s_data.get('hits', {}).get('total', {}).get('value', 0)
-                buckets = s_data.get('aggregations', {}).get('severity_levels', {}).get('buckets', [])
-                for b in buckets:
-                    level = int(b['key'])
-                    count = b['doc_count']
-                    if level >= 13:
-                        data_out["summary"]['critical'] += count
-                    elif level >= 10:
-                        data_out["summary"]['severe'] += count
-                    elif level >= 5:
-                        data_out["summary"]['moderate'] += count
-                    else:
-                        data_out["summary"]['light'] += count
-                else:
-                    print(f"Error fetching summary: Status {resp_summary.status_code} - {resp_summary.text}")
-        except Exception as e:
-            print(f"Error fetching summary: {e}")
-
-        # 2. Top Alerts Query
-        top_query = {
-            "size": 0,
-            "query": {
-                "bool": {
-                    "must": [
-                        {"range": {"@timestamp": {"gte": time_range}}}
-                    ],
-                    "must_not": [
-                        {"term": {"rule.level": 0}}
-                    ]
-                }
-            },
-            "aggs": {
-                "top_rules": {
-                    "terms": {
-                        "field": "rule.description",
-                        "size": top_alerts_limit
-                    },
-                    "aggs": {
-                        "max_level": {
-                            "max": {
-                                "field": "rule.level"
-                            }
+    top_query = {
+        "size": 0,
+        # hits.total is unused here, skip exact counting entirely
+        "track_total_hits": False,
+        "query": {
+            "bool": {
+                "must": [
+                    {"range": {"@timestamp": {"gte": time_range}}}
+                ],
+                "must_not": [
+                    {"term": {"rule.level": 0}}
+                ]
+            }
+        },
+        "aggs": {
+            "top_rules": {
+                "terms": {
+                    "field": "rule.description",
+                    "size": top_alerts_limit
+                },
+                "aggs": {
+                    "max_level": {
+                        "max": {
+                            "field": "rule.level"
                         }
                     }
                 }
             }
         }
+    }
         
-        try:
-            resp_top = await client.post(indexer_url, json=top_query, auth=(user, password))
-            if resp_top.status_code == 200:
-                t_data = resp_top.json()
-                buckets = t_data.get('aggregations', {}).get('top_rules', {}).get('buckets', [])
-                for b in buckets:
-                    data_out["top_alerts"].append({
-                        "description": b['key'],
-                        "count": b['doc_count'],
-                        "level": int(b.get('max_level', {}).get('value', 0))
-                    })
-                else:
-                    print(f"Error fetching top alerts: Status {resp_top.status_code} - {resp_top.text}")
-        except Exception as e:
-            print(f"Error fetching top alerts: {e}")
-
-        # 3. Active Agents Query (Replacing API call)
-        agents_query = {
-             "size": 0,
-             "query": {
-                 "range": {
-                     "@timestamp": {
-                         "gte": time_range
-                     }
+    # Both aggregations travel in a single _msearch round trip instead of
+    # two sequential requests
+    msearch_body = ''.join('{}\n' + json.dumps(q) + '\n' for q in (summary_query, top_query))
+
+    # 3. Active Agents Query (Replacing API call)
+    agents_query = {
+         "size": 0,
+         # hits.total is unused here, skip exact counting entirely
+         "track_total_hits": False,
+         "query": {
+             "range": {
+                 "@timestamp": {
+                     "gte": time_range
                  }
-             },
-             "aggs": {
-                 "agents": {
-                     "terms": {
-                         "field": "agent.name",
-                         "size": 100
-                     },
-                     "aggs": {
-                         "ips": {
-                             "terms": {
-                                 "field": "agent.ip",
-                                 "size": 1
-                             }
+             }
+         },
+         "aggs": {
+             "agents": {
+                 "terms": {
+                     "field": "agent.name",
+                     "size": 100
+                 },
+                 "aggs": {
+                     "ips": {
+                         "terms": {
+                             "field": "agent.ip",
+                             "size": 1
                          }
                      }
                  }
              }
-        }
+         }
+    }
 
-        try:
-            resp_agents = await client.post(indexer_url, json=agents_query, auth=(user, password))
-            if resp_agents.status_code == 200:
-                a_data = resp_agents.json()
-                buckets = a_data.get('aggregations', {}).get('agents', {}).get('buckets', [])
-                for b in buckets:
-                    agent_name = b['key']
-                    ip_buckets = b.get('ips', {}).get('buckets', [])
-                    agent_ip = ip_buckets[0]['key'] if ip_buckets else "Unknown"
+    # The aggregation batch and the agents query are independent, so they
+    # run concurrently; a failure in one still lets the other populate its
+    # part of the report
+    resp, resp_agents = await asyncio.gather(
+        client.post(msearch_url, content=msearch_body,
+                    headers={'Content-Type': 'application/x-ndjson'},
+                    auth=(user, password)),
+        client.post(indexer_url, json=agents_query, auth=(user, password)),
+        return_exceptions=True,
+    )
+
+    try:
+        if isinstance(resp, BaseException):
+            raise resp
+        if resp.status_code == 200:
+            responses = resp.json().get('responses', [])
+            s_data = responses[0] if len(responses) > 0 else {}
+            t_data = responses[1] if len(responses) > 1 else {}
+
+            data_out["summary"]['total'] = s_data.get('hits', {}).get('total', {}).get('value', 0)
+            for b in s_data.get('aggregations', {}).get('severity_levels', {}).get('buckets', []):
+                cat = _LEVEL_TO_BUCKET[min(int(b['key']), 13)]
+                data_out["summary"][cat] += b['doc_count']
+
+            for b in t_data.get('aggregations', {}).get('top_rules', {}).get('buckets', []):
+                data_out["top_alerts"].append({
+                    "description": b['key'],
+                    "count": b['doc_count'],
+                    "level": int(b.get('max_level', {}).get('value', 0))
+                })
+        else:
+            print(f"Error fetching alert aggregations: Status {resp.status_code} - {resp.text}")
+    except Exception as e:
+        print(f"Error fetching alert aggregations: {e}")
+
+    try:
+        if isinstance(resp_agents, BaseException):
+            raise resp_agents
+        if resp_agents.status_code == 200:
+            a_data = resp_agents.json()
+            buckets = a_data.get('aggregations', {}).get('agents', {}).get('buckets', [])
+            for b in buckets:
+                agent_name = b['key']
+                ip_buckets = b.get('ips', {}).get('buckets', [])
+                agent_ip = ip_buckets[0]['key'] if ip_buckets else "Unknown"
                     
-                    data_out["agents"].append({
-                        "name": agent_name,
-                        "ip": agent_ip,
-                        "status": "active",
-                        "os": {"name": "N/A (Logs)"}
-                    })
-                else:
-                    print(f"Error fetching agents: Status {resp_agents.status_code} - {resp_agents.text}")
-        except Exception as e:
-            print(f"Error fetching agents from logs: {e}")
+                data_out["agents"].append({
+                    "name": agent_name,
+                    "ip": agent_ip,
+                    "status": "active",
+                    "os": {"name": "N/A (Logs)"}
+                })
+        else:
+            print(f"Error fetching agents: Status {resp_agents.status_code} - {resp_agents.text}")
+    except Exception as e:
+        print(f"Error fetching agents from logs: {e}")
 
     return data_out
 
@@ -194,19 +273,11 @@ def generate_report_pdf(data):
     pdf = PDFReport()
     pdf.alias_nb_pages()
     pdf.add_page()
-    
-    # Colors
-    COLOR_PRIMARY = (15, 23, 42) # Slate 900
-    COLOR_SECONDARY = (100, 116, 139) # Slate 500
-    COLOR_ACCENT = (14, 165, 233) # Sky 500
-    COLOR_DANGER = (239, 68, 68) # Red 500
-    COLOR_WARNING = (245, 158, 11) # Amber 500
-    COLOR_SUCCESS = (16, 185, 129) # Emerald 500
 
     # Timestamp
     pdf.set_font('Helvetica', '', 10)
     pdf.set_text_color(*COLOR_SECONDARY)
-    now_str = datetime.datetime.now().strftime("%d/%m/%Y à %H:%M")
+    now_str = time.strftime("%d/%m/%Y à %H:%M")
     pdf.cell(0, 10, f"Date du rapport : {now_str}", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(5)
 
@@ -324,26 +395,18 @@ def generate_report_pdf(data):
 
         # Rows
         pdf.set_font('Helvetica', '', 10)
+        set_color = _make_color_setter(pdf)
         for agent in data['agents']:
             name = agent.get('name', 'Unknown')
             # ip = agent.get('ip', 'Unknown') # Removed per request
-            status = agent.get('status', 'Unknown')
-            
+
             # Logic for Updates (Placeholder as we only have logs)
             # If status (activity) is active, we assume we are monitoring it.
             # Without vulnerability-detector data, we can't be sure of "Up to Date".
-            if status == "active":
-                update_text = "Sous Surveillance" # Under Surveillance
-                pdf.set_text_color(*COLOR_SUCCESS)
-            else:
-                update_text = "Inconnu"
-                pdf.set_text_color(*COLOR_SECONDARY)
+            update_text, row_color = _AGENT_STATUS_MAP.get(agent.get('status'), _AGENT_STATUS_DEFAULT)
+            set_color(row_color)
 
             pdf.cell(100, 8, name, 1, 0, 'L')
-            
-            # Color logic for the cell content
-            # update_text is already determined above
-            
             pdf.cell(90, 8, update_text, 1, 1, 'C')
 
     pdf.ln(10)
@@ -379,22 +442,23 @@ def generate_report_pdf(data):
         pdf.cell(0, 10, "Aucun événement significatif remonté.", new_x="LMARGIN", new_y="NEXT")
     else:
         pdf.set_font('Helvetica', '', 10)
+        set_color = _make_color_setter(pdf)
         for alert in data['top_alerts']:
             count = alert['count']
             desc = alert['description']
             level = alert['level']
-            
+
             # Bullet point
             clean_desc = desc.replace("\n", " ")[:80] + "..." if len(desc) > 80 else desc
             pdf.cell(10, 8, f"- ({count})", align='R')
-            
+
             # Color code level
-            if level >= 10: pdf.set_text_color(*COLOR_DANGER)
-            elif level >= 5: pdf.set_text_color(*COLOR_WARNING)
-            else: pdf.set_text_color(0, 0, 0)
-            
+            if level >= 10: set_color(COLOR_DANGER)
+            elif level >= 5: set_color(COLOR_WARNING)
+            else: set_color((0, 0, 0))
+
             pdf.cell(0, 8, f"Niv.{level} : {clean_desc}", new_x="LMARGIN", new_y="NEXT")
-            pdf.set_text_color(0, 0, 0)
+            set_color((0, 0, 0))
 
     # 4. Recommendations
     pdf.ln(10)
@@ -422,4 +486,13 @@ def generate_report_pdf(data):
         pdf.multi_cell(0, 6, f"{i}. {reco}")
         pdf.ln(2)
 
-    return pdf.output()
\ No newline at end of file
+    return pdf.output()
+
+async def generate_report_pdf_async(data):
+    """Render the report in a worker thread.
+
+    generate_report_pdf is CPU-bound (layout, font metrics, compression);
+    running it through asyncio.to_thread keeps the event loop free to serve
+    the UI while the report is produced.
+    """
+    return await asyncio.to_thread(generate_report_pdf, data)
\ No newline at end of file
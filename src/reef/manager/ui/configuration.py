@@ -1,5 +1,5 @@
 from nicegui import ui
-from reef.manager.core import SchemaManager, update_yaml_config_from_schema, update_ini_inventory, load_current_config, BASE_DIR, GROUP_VARS_FILE, HOSTS_INI_FILE
+from reef.manager.core import SchemaManager, update_yaml_config_from_schema, update_ini_inventory, load_current_config, parse_hosts_ini_entries, BASE_DIR, GROUP_VARS_FILE
 from reef.manager.ui_utils import page_header, card_style
 
 def show_configuration():
@@ -80,48 +80,14 @@ def show_configuration():
             fresh_config = load_current_config()
             count = fresh_config.get('endpoint_count', 0)
             
-            # Helper to parse current inventory
-            existing_agents = []
+            # Current inventory from the shared cached parse
+            entries = parse_hosts_ini_entries()
+            existing_agents = entries.get('agents', []) + entries.get('wazuh_agents', [])
             existing_manager = {'user': 'root', 'password': '', 'key': ''}
 
-            if HOSTS_INI_FILE.exists():
-                content = HOSTS_INI_FILE.read_text()
-                lines = content.splitlines()
-                current_section = None
-                
-                for line in lines:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    if line.startswith('['):
-                        current_section = line.strip('[]')
-                        continue
-                    
-                    parts = line.split()
-                    if not parts:
-                        continue
-
-                    # Parse common ansible vars
-                    ip = parts[0]
-                    user = "root"
-                    pw = ""
-                    key = ""
-                    
-                    for p in parts[1:]:
-                        if p.startswith("ansible_user="):
-                            user = p.split("=", 1)[1]
-                        elif p.startswith("ansible_ssh_pass=") or p.startswith("ansible_password="):
-                            pw = p.split("=", 1)[1]
-                        elif p.startswith("ansible_ssh_private_key_file="):
-                            key = p.split("=", 1)[1]
-
-                    if current_section in ['agents', 'wazuh_agents']:
-                        existing_agents.append({'ip': ip, 'user': user, 'password': pw, 'key': key})
-                    elif current_section == 'security_server':
-                        existing_manager['user'] = user
-                        existing_manager['password'] = pw
-                        existing_manager['key'] = key
+            server_entries = entries.get('security_server', [])
+            if server_entries:
+                existing_manager = server_entries[0]
 
             if count > 0:
                 agent_inputs = []
@@ -1,8 +1,167 @@
 from nicegui import ui
-from reef.manager.core import GROUP_VARS_FILE, HOSTS_INI_FILE, load_current_config
+from reef.manager.core import GROUP_VARS_FILE, HOSTS_INI_FILE, load_current_config, parse_hosts_ini
 from reef.manager.ui_utils import page_header, card_style, status_badge
-from reef.manager.pdf_report import fetch_wazuh_alert_summary, generate_report_pdf
+from reef.manager.pdf_report import fetch_wazuh_alert_summary, generate_report_pdf_async
+import asyncio
 import datetime
+import socket
+import struct
+import time
+
+_HOST_COLUMNS = [
+    {'name': 'status', 'label': '', 'field': 'status', 'align': 'left'},
+    {'name': 'ip', 'label': 'IP', 'field': 'ip', 'align': 'left'},
+]
+
+_PING_SLOT = '''
+    <q-td :props="props" auto-width>
+        <q-icon size="xs"
+                :name="props.value === 'up' ? 'check_circle' : (props.value === 'down' ? 'cancel' : 'circle')"
+                :class="props.value === 'up' ? 'text-emerald-500' : (props.value === 'down' ? 'text-rose-500' : 'text-slate-500')" />
+    </q-td>
+'''
+
+def _render_host_list(title, subtitle, empty_text, ips, host_tables):
+    """Shared icon-tile header plus virtualized IP table for one host group."""
+    with ui.row().classes(_SKY_BOX):
+        with ui.element('div').classes(_ICON_TILE + ' text-2xl'):
+            ui.icon('monitor')
+
+        with ui.column().classes('gap-0'):
+            ui.label(title).classes('text-slate-200 font-bold text-lg')
+            ui.label(subtitle).classes('text-slate-400 text-sm')
+
+    if ips:
+        # Virtualized: only visible rows are materialized in the DOM
+        table = ui.table(columns=_HOST_COLUMNS,
+                         rows=[{'ip': ip, 'status': 'pending'} for ip in ips],
+                         row_key='ip') \
+            .props('virtual-scroll :rows-per-page-options="[0]" hide-pagination hide-header dense flat dark') \
+            .classes('w-full h-24 bg-transparent font-mono text-xs text-slate-400')
+        table.add_slot('body-cell-status', _PING_SLOT)
+        host_tables.append(table)
+    else:
+        ui.label(empty_text).classes('col-span-2 text-slate-500')
+
+# Last-known probe results survive page revisits so the dashboard paints a
+# status immediately and only refires probes once the cache goes stale.
+# The refresh button bypasses both caches (force=True).
+_WAZUH_CACHE_TTL = 30.0
+_PING_CACHE_TTL = 5.0
+_wazuh_cache = {'status': None, 'ts': 0.0}
+_ping_cache = {'results': {}, 'ts': 0.0}
+
+# Wazuh status rendered from one state key; a single dict mutation updates
+# text, colour and spinner in one coalesced frame instead of three messages
+_WAZUH_STATUS_HTML = {
+    'checking': '<span class="text-xs text-slate-500">Checking...</span>',
+    'online': '<span class="text-xs text-emerald-400">Online</span>',
+    'unreachable': '<span class="text-xs text-rose-500">Unreachable</span>',
+}
+
+# Frequently reused Tailwind class strings, built once instead of per widget
+_SKY_BOX = 'w-full bg-sky-500/5 border border-sky-500/10 rounded-xl p-4 items-center gap-4'
+_SKY_BOX_HEADER = 'w-full bg-sky-500/5 border border-sky-500/5 rounded-xl p-4 items-center gap-4 justify-between'
+_ICON_TILE = 'flex items-center justify-center w-12 h-12 rounded-lg bg-sky-500 text-white'
+
+_icmp_available = None
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    s = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    s = (s >> 16) + (s & 0xffff)
+    s += s >> 16
+    return ~s & 0xffff
+
+def _icmp_echo_packet(seq):
+    # type 8 (echo request), code 0; the kernel rewrites the identifier
+    payload = b'reef-ping'
+    header = struct.pack('!BBHHH', 8, 0, 0, 0, seq)
+    csum = _icmp_checksum(header + payload)
+    return struct.pack('!BBHHH', 8, 0, csum, 0, seq) + payload
+
+def _icmp_sockets_usable():
+    """Unprivileged ICMP needs net.ipv4.ping_group_range to include us."""
+    global _icmp_available
+    if _icmp_available is None:
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+            _icmp_available = True
+        except OSError:
+            _icmp_available = False
+    return _icmp_available
+
+async def _icmp_probe(ip, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    sock.setblocking(False)
+    try:
+        await loop.sock_connect(sock, (ip, 0))
+        await loop.sock_sendall(sock, _icmp_echo_packet(1))
+        await asyncio.wait_for(loop.sock_recv(sock, 1024), timeout)
+        return True
+    except (asyncio.TimeoutError, OSError):
+        return False
+    finally:
+        sock.close()
+
+async def ping_all(ips):
+    """
+    Probe all IPs and return {ip: alive}.
+    Prefers unprivileged async ICMP sockets (no fork/exec at all); falls
+    back to one batched fping run, then to per-host ping with bounded
+    concurrency.
+    """
+    if not ips:
+        return {}
+    if _icmp_sockets_usable():
+        sem = asyncio.Semaphore(64)
+
+        async def probe(ip):
+            async with sem:
+                return await _icmp_probe(ip)
+
+        alive = await asyncio.gather(*(probe(ip) for ip in ips))
+        return dict(zip(ips, alive))
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'fping', '-C', '1', '-t', '1000', '-q', *ips,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        out, _ = await proc.communicate()
+    except FileNotFoundError:
+        return await _ping_all_fallback(ips)
+
+    results = {}
+    for line in out.decode(errors='ignore').splitlines():
+        # fping -C1 -q reports "1.2.3.4 : 0.42" (alive) or "1.2.3.4 : -" (dead)
+        ip, sep, rtt = line.partition(':')
+        if sep:
+            results[ip.strip()] = rtt.strip() != '-'
+    for ip in ips:
+        results.setdefault(ip, False)
+    return results
+
+async def _ping_all_fallback(ips):
+    # Cap concurrent forks so large inventories don't spawn dozens of processes at once
+    sem = asyncio.Semaphore(8)
+
+    async def check_one(ip):
+        async with sem:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    'ping', '-c', '1', '-W', '1', ip,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                await proc.wait()
+                return ip, proc.returncode == 0
+            except Exception:
+                return ip, False
+
+    return dict(await asyncio.gather(*(check_one(ip) for ip in ips)))
 
 def show_dashboard():
     page_header("Dashboard", "Overview of your security system")
@@ -19,58 +178,27 @@ def show_dashboard():
     manager_ip = config.get('wazuh_manager_ip', 'Unknown')
     enabled_roles = config.get('enabled_roles', [])
         
-    # Count agents
-    agent_ips = []
-    if HOSTS_INI_FILE.exists():
-        content = HOSTS_INI_FILE.read_text()
-        lines = content.splitlines()
-        in_agents = False
-        for line in lines:
-            if line.strip() == "[agents]" or line.strip() == "[wazuh_agents]":
-                in_agents = True
-                continue
-            if line.strip().startswith("[") and line.strip() not in ["[agents]", "[wazuh_agents]"]:
-                in_agents = False
-            
-            if in_agents and line.strip() and not line.strip().startswith("#"):
-                parts = line.strip().split()
-                if parts:
-                    agent_ips.append(parts[0])
+    # Count agents and managers from one cached inventory parse
+    hosts = parse_hosts_ini()
+    agent_ips = hosts.get('agents', []) + hosts.get('wazuh_agents', [])
+    manager_ips = hosts.get('security_server', []) + hosts.get('wazuh_manager', [])
 
     agent_count = len(agent_ips)
-
-    manager_ips = []
-    if HOSTS_INI_FILE.exists():
-        content = HOSTS_INI_FILE.read_text()
-        lines = content.splitlines()
-        in_managers = False
-        for line in lines:
-            if line.strip() == "[security_server]" or line.strip() == "[wazuh_manager]":
-                in_managers = True
-                continue
-            if line.strip().startswith("[") and line.strip() not in ["[security_server]", "[wazuh_manager]"]:
-                in_managers = False
-            
-            if in_managers and line.strip() and not line.strip().startswith("#"):
-                parts = line.strip().split()
-                if parts:
-                    manager_ips.append(parts[0])
-
     manager_count = len(manager_ips)
     
-    # Async Healthcheck
-    import httpx
-    
     async def download_report():
         ui.notify('Generating PDF report... Please wait.', type='info')
         data = await fetch_wazuh_alert_summary()
         if data:
             try:
-                # Convert bytearray to bytes for nicegui
-                pdf_bytes = bytes(generate_report_pdf(data))
                 # Create a localized timestamp for filename
                 filename = f"Reef_Security_Report_{datetime.datetime.now().strftime('%Y-%m-%d')}.pdf"
-                ui.download(pdf_bytes, filename)
+                # Render in a worker thread so the event loop stays responsive
+                buf = await generate_report_pdf_async(data)
+                # Serve straight from memory: a predictable path in the shared
+                # temp dir would leave the report world-readable and open to
+                # symlink clobbering
+                ui.download(bytes(buf), filename)
                 ui.notify('Report generated successfully!', type='positive')
             except Exception as e:
                 ui.notify(f'Error generating PDF: {e}', type='negative')
@@ -78,60 +206,57 @@ def show_dashboard():
         else:
             ui.notify('Failed to fetch data from Wazuh.', type='negative')
 
-    async def check_wazuh(label_status, spinner):
-        try:
-            url = f"http://{manager_ip}:3000"
-            async with httpx.AsyncClient(verify=False, timeout=2.0) as client:
-                response = await client.get(url)
-
-                if response.status_code in [200, 302]:
-                     spinner.visible = False
-                     label_status.classes(remove='text-slate-500', add='text-emerald-400')
-                     label_status.text = "Online"
-                else:
-                     spinner.visible = False
-                     label_status.classes(remove='text-slate-500', add='text-amber-500')
-                     label_status.text = f"Status {response.status_code}"
-        except Exception as e:
-            spinner.visible = False
-            label_status.classes(remove='text-slate-500', add='text-rose-500')
-            label_status.text = "Unreachable"
-
-    import asyncio
+    wazuh_state = {'status': 'checking'}
 
-    async def check_ping(ip, status_icon):
+    async def check_wazuh():
+        # A plain TCP connect is enough for a liveness indicator and costs
+        # one round trip instead of a full HTTP exchange
         try:
-            proc = await asyncio.create_subprocess_exec(
-                'ping', '-c', '1', '-W', '1000', ip,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL
-            )
-            await proc.wait()
-             
-            if proc.returncode == 0:
-                status_icon.classes(remove='text-slate-500', add='text-emerald-500')
-                status_icon.props('icon=check_circle')
-            else:
-                 status_icon.classes(remove='text-slate-500', add='text-rose-500')
-                 status_icon.props('icon=cancel')
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(manager_ip, 3000), timeout=1.0)
+            writer.close()
+            await writer.wait_closed()
+            status = 'online'
         except Exception:
-             status_icon.classes(remove='text-slate-500', add='text-rose-500')
-             status_icon.props('icon=cancel')
-
-    wazuh_refs = {}
-    ping_checks = []
-
-    async def refresh_infrastructure():
-        if 'label' in wazuh_refs and 'spinner' in wazuh_refs:
-            wazuh_refs['label'].text = 'Checking...'
-            wazuh_refs['label'].classes(remove='text-emerald-400 text-amber-500 text-rose-500', add='text-slate-500')
-            wazuh_refs['spinner'].visible = True
-            asyncio.create_task(check_wazuh(wazuh_refs['label'], wazuh_refs['spinner']))
-        
-        for ip, icon in ping_checks:
-            icon.classes(remove='text-emerald-500 text-rose-500', add='text-slate-500')
-            icon.props('icon=circle')
-            asyncio.create_task(check_ping(ip, icon))
+            # Down/firewalled hosts usually drop the SYN (timeout) rather
+            # than refuse it — both mean unreachable to the user
+            status = 'unreachable'
+        wazuh_state['status'] = status
+        _wazuh_cache['status'] = status
+        _wazuh_cache['ts'] = time.monotonic()
+
+    host_tables = []
+
+    def _apply_ping_results(results):
+        for table in host_tables:
+            for row in table.rows:
+                row['status'] = 'up' if results.get(row['ip'], False) else 'down'
+            table.update()
+
+    async def ping_all_and_apply():
+        results = await ping_all([row['ip'] for table in host_tables for row in table.rows])
+        _ping_cache['results'] = results
+        _ping_cache['ts'] = time.monotonic()
+        _apply_ping_results(results)
+
+    async def refresh_infrastructure(force=True):
+        now = time.monotonic()
+
+        if not force and _wazuh_cache['status'] and now - _wazuh_cache['ts'] < _WAZUH_CACHE_TTL:
+            wazuh_state['status'] = _wazuh_cache['status']
+        else:
+            wazuh_state['status'] = 'checking'
+            asyncio.create_task(check_wazuh())
+
+        if not force and _ping_cache['results'] and now - _ping_cache['ts'] < _PING_CACHE_TTL:
+            _apply_ping_results(_ping_cache['results'])
+            return
+
+        for table in host_tables:
+            for row in table.rows:
+                row['status'] = 'pending'
+            table.update()
+        asyncio.create_task(ping_all_and_apply())
 
     # ... Grid Layout ...
     with ui.grid(columns=2).classes('w-full gap-6'):
@@ -140,7 +265,7 @@ def show_dashboard():
         with ui.column().classes(card_style()):
             with ui.row().classes('w-full justify-between items-center mb-4 border-b border-white/10 pb-2'):
                 ui.label('System Health').classes('text-slate-400 font-bold')
-                ui.button(on_click=refresh_infrastructure).props('icon=refresh flat dense round size=sm').classes('text-slate-500 hover:text-white')
+                ui.button(on_click=lambda: refresh_infrastructure(force=True)).props('icon=refresh flat dense round size=sm').classes('text-slate-500 hover:text-white')
             
             with ui.column().classes('gap-6 w-full'):
                 
@@ -156,73 +281,50 @@ def show_dashboard():
                         #ui.label(manager_ip).classes('font-mono text-slate-300 bg-white/5 px-2 py-1 rounded')
 
                 # Wazuh Dashboard Check
-                with ui.row().classes('w-full bg-sky-500/5 border border-sky-500/5 rounded-xl p-4 items-center gap-4 justify-between'):
+                with ui.row().classes(_SKY_BOX_HEADER):
                     with ui.row().classes('items-center gap-4'):
-                        with ui.element('div').classes('flex items-center justify-center w-12 h-12 rounded-lg bg-sky-500 text-white text-xl'):
+                        with ui.element('div').classes(_ICON_TILE + ' text-xl'):
                             ui.icon('security')
                         
                         with ui.column().classes('gap-0'):
                             ui.label('Security Dashboard').classes('text-slate-200 font-bold text-lg')
                             ui.label('View alerts and events').classes('text-slate-400 text-xs')
                             with ui.row().classes('items-center gap-2'):
-                                status_label = ui.label('Checking...').classes('text-xs text-slate-500')
-                                spinner = ui.spinner('dots', size='xs').classes('text-slate-500')
-                                wazuh_refs['label'] = status_label
-                                wazuh_refs['spinner'] = spinner
+                                ui.html().bind_content_from(
+                                    wazuh_state, 'status',
+                                    backward=_WAZUH_STATUS_HTML.__getitem__)
+                                ui.spinner('dots', size='xs').classes('text-slate-500') \
+                                    .bind_visibility_from(wazuh_state, 'status',
+                                                          backward=lambda s: s == 'checking')
 
                     ui.button('Open').props(f'flat dense size=sm href=http://{manager_ip}:3000/d/54540/security-dashboard target=_blank').classes('text-sky-400')
 
                 # Managers Box
-                with ui.row().classes('w-full bg-sky-500/5 border border-sky-500/10 rounded-xl p-4 items-center gap-4'):
-                    with ui.element('div').classes('flex items-center justify-center w-12 h-12 rounded-lg bg-sky-500 text-white text-2xl'):
-                        ui.icon('monitor')
-                    
-                    with ui.column().classes('gap-0'):
-                        ui.label(f'{manager_count} Security Servers').classes('text-slate-200 font-bold text-lg')
-                        ui.label('Central Management Nodes').classes('text-slate-400 text-sm')
-                
-                if manager_ips:
-                    with ui.scroll_area().classes('w-full h-24 gap-1'):
-                         for ip in manager_ips:
-                             with ui.row().classes('items-center gap-2'):
-                                 # We start with a spinner or generic icon
-                                 status_icon = ui.icon('circle', size='xs').classes('text-slate-500')
-                                 ping_checks.append((ip, status_icon))
-                                 ui.label(f'{ip}').classes('font-mono text-slate-400 text-xs')
-                                 # Trigger separate check for each
-                                 ui.timer(0.1, lambda i=ip, s=status_icon: check_ping(i, s), once=True)
-                else:
-                    ui.label('No managers found.').classes('col-span-2 text-slate-500')
+                _render_host_list(f'{manager_count} Security Servers', 'Central Management Nodes',
+                                  'No managers found.', manager_ips, host_tables)
 
                 # Agents Box
-                with ui.row().classes('w-full bg-sky-500/5 border border-sky-500/10 rounded-xl p-4 items-center gap-4'):
-                    with ui.element('div').classes('flex items-center justify-center w-12 h-12 rounded-lg bg-sky-500 text-white text-2xl'):
-                        ui.icon('monitor')
-                    
-                    with ui.column().classes('gap-0'):
-                        ui.label(f'{agent_count} Protected Computers').classes('text-slate-200 font-bold text-lg')
-                        ui.label('Monitored Devices').classes('text-slate-400 text-sm')
-                
-                if agent_ips:
-                    with ui.scroll_area().classes('w-full h-24 gap-1'):
-                         for ip in agent_ips:
-                             with ui.row().classes('items-center gap-2'):
-                                 # We start with a spinner or generic icon
-                                 status_icon = ui.icon('circle', size='xs').classes('text-slate-500')
-                                 ping_checks.append((ip, status_icon))
-                                 ui.label(f'{ip}').classes('font-mono text-slate-400 text-xs')
-                                 # Trigger separate check for each
-                                 ui.timer(0.1, lambda i=ip, s=status_icon: check_ping(i, s), once=True)
-                else:
-                    ui.label('No agents found.').classes('col-span-2 text-slate-500')
+                _render_host_list(f'{agent_count} Protected Computers', 'Monitored Devices',
+                                  'No agents found.', agent_ips, host_tables)
 
-                
 
 
+
+        # Lower cards are deferred so the System Health skeleton paints first
+        roles_slot = ui.column().classes(card_style())
+        with roles_slot:
+            ui.skeleton().classes('h-24 w-full')
+
+        reports_slot = ui.column().classes(card_style())
+        with reports_slot:
+            ui.skeleton().classes('h-24 w-full')
+
+    def render_below_the_fold():
         # Active Roles Card
-        with ui.column().classes(card_style()):
+        roles_slot.clear()
+        with roles_slot:
             ui.label('Installed Features').classes('text-slate-400 font-bold mb-4 border-b border-white/10 pb-2 w-full')
-            
+
             with ui.grid(columns=2).classes('w-full gap-3 mb-6'):
                 if enabled_roles:
                     for role in enabled_roles:
@@ -233,28 +335,32 @@ def show_dashboard():
                     ui.label('No roles enabled.').classes('col-span-2 text-slate-500')
 
             ui.separator().classes('bg-white/10 mb-4')
-            
+
             with ui.column().classes('gap-1'):
                 ui.label('ENVIRONMENT INFO').classes('text-xs text-slate-500 font-bold mb-2')
-                
+
                 with ui.row().classes('gap-6'):
                     with ui.column().classes('gap-0'):
                         ui.label('Config File').classes('text-xs text-slate-400')
                         ui.label('Main Settings').classes('text-sm text-slate-300')
                         ui.tooltip("group_vars/all.yml").classes('text-slate-300 text-xs')
-                    
+
                     with ui.column().classes('gap-0'):
                         ui.label('Inventory').classes('text-xs text-slate-400')
                         ui.label('Computer List').classes('text-sm text-slate-300')
                         ui.tooltip("hosts.ini").classes('text-slate-300 text-xs')
 
         # Reports Card
-        with ui.column().classes(card_style()):
+        reports_slot.clear()
+        with reports_slot:
             ui.label('Security Reports').classes('text-slate-400 font-bold mb-4 border-b border-white/10 pb-2 w-full')
             ui.label('Generate a comprehensive PDF audit based on Wazuh data.').classes('text-slate-400 text-sm mb-4')
-            
+
             with ui.row().classes('items-center gap-4'):
                 ui.button('Download Audit Report (PDF)', on_click=download_report).props('icon=picture_as_pdf').classes('w-full bg-indigo-600 text-white hover:bg-indigo-700 transition-colors')
 
-    # Trigger check
-    ui.timer(0.1, lambda: check_wazuh(status_label, spinner), once=True)
+    ui.timer(0.05, render_below_the_fold, once=True)
+
+    # Single one-shot kick-off: fresh cache entries render as-is, stale ones
+    # refire the Wazuh check and one batched ping for all hosts
+    ui.timer(0.1, lambda: refresh_infrastructure(force=False), once=True)
@@ -1,9 +1,46 @@
 from nicegui import ui
 import os
 import asyncio
+import json
 from pathlib import Path
-from reef.manager.core import ANSIBLE_DIR, HOSTS_INI_FILE, load_current_config, update_yaml_config_from_schema
-from reef.manager.ui_utils import page_header, card_style, async_run_command, async_run_ansible_playbook, app_state
+from types import MappingProxyType
+from reef.manager.core import ANSIBLE_DIR, HOSTS_INI_FILE, list_roles, load_current_config, parse_hosts_ini, update_yaml_config_from_schema
+from reef.manager.ui_utils import BatchedLog, page_header, card_style, async_run_command, async_run_ansible_playbook, app_state, TASK_RESULT_COLUMNS, TASK_STATUS_SLOT
+
+# Role metadata for user friendly display; frozen so page renders share one dict
+_ROLE_METADATA = MappingProxyType({
+    'wazuh-server': ('Security Master Server', 'The central brain that analyzes security data and manages agents.'),
+    'wazuh-agent': ('Security Agent', 'Lightweight software installed on computers to monitor activity.'),
+    'wazuh-indexer': ('Data Engine', 'High-performance database for storing security logs.'),
+    'wazuh-dashboard': ('Wazuh Interface', 'Web portal for deep security analysis and threat hunting.'),
+    'grafana': ('Security Metrics Dashboard', 'Beautiful visualizations of your system\'s security status.'),
+    'suricata': ('Network Intrusion Detection', 'Inspects network traffic to block malicious attacks.'),
+    'fail2ban': ('Brute-Force Blocker', 'Automatically blocks IP addresses that try to guess passwords.'),
+    'ufw': ('Firewall', 'Basic network shield to control incoming connections.'),
+    'common': ('Base System Utilities', 'Essential tools required for the system to run.'),
+    'cleanup': ('Cleanup', 'Remove all existing components.'),
+})
+
+# Internal roles hidden from the selection grid
+_SKIP_ROLES = frozenset({'prerequisites'})
+
+def _ansible_forks():
+    """Forks sized to the inventory: one per host, capped at 4x the CPU count."""
+    host_count = sum(len(ips) for ips in parse_hosts_ini().values())
+    return min(host_count or 5, (os.cpu_count() or 1) * 4)
+
+# Strictly coupled roles: toggling one side drags the other along
+_COUPLED = {'wazuh-indexer': 'wazuh-server', 'wazuh-server': 'wazuh-indexer'}
+
+def _on_role_change(e):
+    """Shared checkbox handler keeping coupled roles (indexer <-> server) in sync."""
+    chk = e.sender
+    partner = getattr(chk, 'partner', None)
+    if partner is None or partner.value == e.value:
+        return
+    partner.value = e.value
+    action, kind = ('Auto-selected', 'positive') if e.value else ('Auto-deselected', 'warning')
+    ui.notify(f"{action} {partner.role_label} (coupled with {chk.role_label})", type=kind)
 
 def show_deploy():
     page_header("Installation & Management", "Install, update, or remove security software")
@@ -27,80 +64,46 @@ def show_deploy():
                 with ui.column().classes(card_style() + ' w-full'):
                     ui.label("Features to Install").classes('text-xl font-bold text-slate-200 mb-4')
                     
-                    roles_dir = ANSIBLE_DIR / "roles"
-                    all_roles = sorted([d.name for d in roles_dir.iterdir() if d.is_dir()]) if roles_dir.exists() else []
+                    all_roles = list_roles()
                     current_config = load_current_config()
                     enabled = current_config.get('enabled_roles', all_roles)
                     
-                    selected_roles = []
-                    
-                    # Role Metadata for User Friendly Display
-                    ROLE_METADATA = {
-                        'wazuh-server': ('Security Master Server', 'The central brain that analyzes security data and manages agents.'),
-                        'wazuh-agent': ('Security Agent', 'Lightweight software installed on computers to monitor activity.'),
-                        'wazuh-indexer': ('Data Engine', 'High-performance database for storing security logs.'),
-                        'wazuh-dashboard': ('Wazuh Interface', 'Web portal for deep security analysis and threat hunting.'),
-                        'grafana': ('Security Metrics Dashboard', 'Beautiful visualizations of your system\'s security status.'),
-                        'suricata': ('Network Intrusion Detection', 'Inspects network traffic to block malicious attacks.'),
-                        'fail2ban': ('Brute-Force Blocker', 'Automatically blocks IP addresses that try to guess passwords.'),
-                        'ufw': ('Firewall', 'Basic network shield to control incoming connections.'),
-                        'common': ('Base System Utilities', 'Essential tools required for the system to run.'),
-                        'cleanup': ('Cleanup', 'Remove all existing components.'),
-                    }
-
                     role_checkboxes = {}
 
-                    def handle_role_change(role_name, value):
-                        # Strict coupling: Indexer <-> Server
-                        if role_name == 'wazuh-indexer':
-                            if value:
-                                # Indexer ON -> Server ON
-                                if 'wazuh-server' in role_checkboxes and not role_checkboxes['wazuh-server'].value:
-                                    role_checkboxes['wazuh-server'].value = True
-                                    ui.notify('Auto-selected Wazuh Server (coupled with Indexer)', type='positive')
-                            else:
-                                # Indexer OFF -> Server OFF
-                                if 'wazuh-server' in role_checkboxes and role_checkboxes['wazuh-server'].value:
-                                    role_checkboxes['wazuh-server'].value = False
-                                    ui.notify('Auto-deselected Wazuh Server (coupled with Indexer)', type='warning')
-
-                        if role_name == 'wazuh-server':
-                            if value:
-                                # Server ON -> Indexer ON
-                                if 'wazuh-indexer' in role_checkboxes and not role_checkboxes['wazuh-indexer'].value:
-                                    role_checkboxes['wazuh-indexer'].value = True
-                                    ui.notify('Auto-selected Wazuh Indexer (coupled with Server)', type='positive')
-                            else:
-                                # Server OFF -> Indexer OFF
-                                if 'wazuh-indexer' in role_checkboxes and role_checkboxes['wazuh-indexer'].value:
-                                    role_checkboxes['wazuh-indexer'].value = False
-                                    ui.notify('Auto-deselected Wazuh Indexer (coupled with Server)', type='warning')
-
                     with ui.grid(columns=2).classes('w-full gap-4'):
                         for role in all_roles:
                             # Skip internal roles
-                            if role in ['prerequisites']:
+                            if role in _SKIP_ROLES:
                                 continue
-                                
-                            meta = ROLE_METADATA.get(role, (role.title(), "System component"))
+
+                            meta = _ROLE_METADATA.get(role, (role.title(), "System component"))
                             title, desc = meta
                             
                             with ui.row().classes('w-full bg-slate-800/50 border border-white/5 p-4 rounded-xl items-start gap-4 hover:border-indigo-500/50 transition-colors'):
                                 chk = ui.checkbox(value=(role in enabled)).classes('scale-125 mt-1')
-                                chk.on_value_change(lambda e, r=role: handle_role_change(r, e.value))
-                                
-                                selected_roles.append((role, chk))
+                                chk.role_label = title
+                                chk.on_value_change(_on_role_change)
                                 role_checkboxes[role] = chk
-                                
-                                with ui.column().classes('gap-1'):
-                                    ui.label(title).classes('font-bold text-slate-200 text-base')
-                                    ui.label(desc).classes('text-slate-400 text-xs leading-tight')
-                    
+
+                                # One element per role for the static text, not
+                                # a column plus two labels: fewer Vue mounts
+                                ui.html(
+                                    f'<div class="font-bold text-slate-200 text-base">{title}</div>'
+                                    f'<div class="text-slate-400 text-xs leading-tight">{desc}</div>'
+                                )
+
+                    # Wire coupled partners once all checkboxes exist
+                    for role_a, role_b in _COUPLED.items():
+                        if role_a in role_checkboxes and role_b in role_checkboxes:
+                            role_checkboxes[role_a].partner = role_checkboxes[role_b]
+
                     def save_roles(notify=True):
-                        new_enabled = [r for r, c in selected_roles if c.value]
-                        # Must reload config to avoid overwriting unrelated concurrent edits (if any)
-                        cfg = load_current_config()
-                        cfg['enabled_roles'] = new_enabled
+                        new_enabled = [r for r, c in role_checkboxes.items() if c.value]
+                        # load_current_config serves a shared cached dict, so
+                        # build an updated copy instead of mutating it in place
+                        # (a failed write would otherwise leave the cache
+                        # holding never-persisted state)
+                        cfg = {**load_current_config(), 'enabled_roles': new_enabled}
                         if update_yaml_config_from_schema(cfg):
                             if notify:
                                 ui.notify("Selection saved!", type='positive')
@@ -113,32 +116,9 @@ def show_deploy():
                     
                     target_scope = ui.radio(['All Computers', 'Security Server Only', 'Specific Computer'], value='All Computers').classes('text-slate-300').props('inline')
                     
-                    # Parse agents for dropdown
-                    agent_options = []
-                    if HOSTS_INI_FILE.exists():
-                        content = HOSTS_INI_FILE.read_text()
-                        for line in content.splitlines():
-                            line = line.strip()
-                            if line and not line.startswith('#') and not line.startswith('['):
-                                parts = line.split()
-                                if parts:
-                                    # Very basic check to exclude manager if possible, or just list all IPs
-                                    # Better: check if it was under [agents]
-                                    pass
-                        
-                        # Re-implementing a quick parser strictly for agents to populate dropdown
-                        # We can reuse logic from dashboard or config if we refactor, but for now inline is safe
-                        current_section = None
-                        for line in content.splitlines():
-                            line = line.strip()
-                            if line.startswith('['):
-                                current_section = line.strip('[]')
-                                continue
-                            
-                            if current_section in ['agents', 'wazuh_agents'] and line and not line.startswith('#'):
-                                parts = line.split()
-                                if parts:
-                                    agent_options.append(parts[0])
+                    # Agents for dropdown, from the shared cached inventory parse
+                    hosts = parse_hosts_ini()
+                    agent_options = hosts.get('agents', []) + hosts.get('wazuh_agents', [])
 
                     agent_select = ui.select(agent_options, label="Select Computer").classes('w-full text-slate-300')
                     agent_select.bind_visibility_from(target_scope, 'value', value='Specific Computer')
@@ -149,11 +129,11 @@ def show_deploy():
                         btn_deploy = ui.button("Deploy", on_click=lambda: run_deployment()).classes('bg-indigo-600 flex-grow py-4 text-lg')
                         btn_stop_deploy = ui.button("Stop", on_click=app_state.cancel_process).classes('bg-red-900 w-1/6 py-4 text-lg')
                         
-                        btn_deploy.bind_enabled_from(app_state, 'running_process', backward=lambda x: x is None)
-                        btn_stop_deploy.bind_enabled_from(app_state, 'running_process', backward=lambda x: x is not None)
+                        btn_deploy.bind_enabled_from(app_state, 'is_idle')
+                        btn_stop_deploy.bind_enabled_from(app_state, 'is_running')
 
                     credentials_container = ui.column().classes('w-full mt-4 hidden')
-                    deploy_log = ui.log().classes('w-full h-64 bg-slate-900 font-mono text-xs p-4 rounded-xl border border-white/10 mt-4')
+                    deploy_log = BatchedLog(ui.log().classes('w-full h-64 bg-slate-900 font-mono text-xs p-4 rounded-xl border border-white/10 mt-4'))
 
                     results_container = ui.column().classes('w-full mt-4')
 
@@ -172,59 +152,55 @@ def show_deploy():
                 inventory = HOSTS_INI_FILE
                 
                 # Determine limit
-                limit_arg = ""
+                limit_args = []
                 scope = target_scope.value
                 if scope == 'Security Server Only':
-                    limit_arg = "-l security_server"
+                    limit_args = ['-l', 'security_server']
                 elif scope == 'Specific Computer':
                     if agent_select.value:
-                        limit_arg = f"-l {agent_select.value}"
+                        limit_args = ['-l', agent_select.value]
                     else:
                         ui.notify("Please select an agent", type='warning')
                         btn_deploy.enable()
                         return
 
-                cmd = f"ansible-playbook {playbook} -i {inventory} {limit_arg}"
-                
-                ret_code, full_output, task_results = await async_run_ansible_playbook(cmd, deploy_log)
+                cmd = ['ansible-playbook', str(playbook), '-i', str(inventory),
+                       '-f', str(_ansible_forks()), *limit_args]
 
-                # Render Results Table
-                if task_results:
-                     with results_container:
-                        ui.label("Installation Progress").classes('text-lg font-bold text-slate-200 mb-2')
-                        
-                        cols = [
-                            {'name': 'host', 'label': 'Computer', 'field': 'host', 'align': 'left'},
-                            {'name': 'task', 'label': 'Action', 'field': 'task', 'align': 'left'},
-                            {'name': 'status', 'label': 'Result', 'field': 'status', 'align': 'left'},
-                        ]
-                        
-                        table = ui.table(columns=cols, rows=task_results, row_key='task').classes('w-full')
-                        table.add_slot('body-cell-status', '''
-                            <q-td :props="props">
-                                <q-badge :color="props.value === 'ok' ? 'green' : (props.value === 'changed' ? 'amber' : 'red')" text-color="black">
-                                    {{ props.value }}
-                                </q-badge>
-                            </q-td>
-                        ''')
+                # Results table is created on the first parsed result and
+                # filled row-by-row while the playbook is still running
+                results_table = None
+
+                def on_task_result(result):
+                    nonlocal results_table
+                    if results_table is None:
+                        with results_container:
+                            ui.label("Installation Progress").classes('text-lg font-bold text-slate-200 mb-2')
+
+                            results_table = ui.table(columns=TASK_RESULT_COLUMNS, rows=[], row_key='task').classes('w-full')
+                            results_table.add_slot('body-cell-status', TASK_STATUS_SLOT)
+                    results_table.rows.append(result)
+                    results_table.update()
+
+                ret_code, task_results, admin_password = await async_run_ansible_playbook(cmd, deploy_log, on_task_result)
 
                 if ret_code == 0:
-                     check_credentials(full_output)
+                     check_credentials(admin_password)
 
-            def check_credentials(output):
+            def check_credentials(password):
                 # Attempt to retrieve credentials
                 config = load_current_config()
                 manager_ip = config.get('wazuh_manager_ip', '<manager_ip>')
-                
-                password = None
+
                 pass_file = ANSIBLE_DIR / 'inventory' / 'wazuh-admin-password.txt'
-                
-                import re
-                match = re.search(r'"admin",\s+"([^"]+)"', output)
-                if match:
-                    password = match.group(1)
-                elif pass_file.exists():
-                     password = pass_file.read_text().strip().splitlines()[0] if pass_file.read_text().strip() else None
+
+                if not password:
+                    # Single read; a missing file just means no fallback password
+                    try:
+                        txt = pass_file.read_text().strip()
+                    except FileNotFoundError:
+                        txt = ''
+                    password = txt.splitlines()[0] if txt else None
                 
                 # Only show if retrieved
                 if password:
@@ -254,25 +230,44 @@ def show_deploy():
 
 
         # --- CLEANUP TAB ---
-        with ui.tab_panel(tab_cleanup):
-            with ui.column().classes('w-full gap-6'):
+        # Built lazily on first visit; most sessions never leave the deploy tab
+        panel_cleanup = ui.tab_panel(tab_cleanup)
+        cleanup_built = False
+
+        def build_cleanup_tab():
+            nonlocal cleanup_built
+            cleanup_built = True
+
+            with panel_cleanup, ui.column().classes('w-full gap-6'):
                 with ui.row().classes('w-full bg-rose-500/10 border border-rose-500/20 p-4 rounded-xl items-center gap-4'):
                     ui.icon('dangerous', size='md').classes('text-rose-500')
                     ui.label("Warning: This will remove all security software from your computers.").classes('text-rose-500 font-bold')
-                
-                cleanup_log = ui.log().classes('w-full h-64 bg-slate-900 font-mono text-xs p-4 rounded-xl border border-white/10')
-                
+
+                cleanup_log = BatchedLog(ui.log().classes('w-full h-64 bg-slate-900 font-mono text-xs p-4 rounded-xl border border-white/10'))
+
                 async def run_cleanup():
                     cleanup_log.clear()
                     playbook = ANSIBLE_DIR / "playbooks" / "experimental.yml"
                     inventory = HOSTS_INI_FILE
-                    
-                    cmd = f"ansible-playbook {playbook} -i {inventory} -e '{{\"enabled_roles\": [\"cleanup\"]}}'"
-                    await async_run_command(cmd, cleanup_log)
+
+                    cmd = ['ansible-playbook', str(playbook), '-i', str(inventory),
+                           '-f', str(_ansible_forks()),
+                           '-e', json.dumps({'enabled_roles': ['cleanup']})]
+                    # Cleanup is independent per host, so the free strategy
+                    # lets fast hosts finish without waiting for slow ones
+                    await async_run_command(cmd, cleanup_log, extra_env={'ANSIBLE_STRATEGY': 'free'})
 
                 with ui.row().classes('w-full gap-4'):
                     btn_cleanup = ui.button("Uninstall Everything", on_click=lambda: run_cleanup()).classes('bg-rose-600 flex-grow py-4 text-lg')
                     btn_stop_cleanup = ui.button("Stop", on_click=app_state.cancel_process).classes('bg-red-900 w-1/6 py-4 text-lg')
-                    
-                    btn_cleanup.bind_enabled_from(app_state, 'running_process', backward=lambda x: x is None)
-                    btn_stop_cleanup.bind_enabled_from(app_state, 'running_process', backward=lambda x: x is not None)
+
+                    btn_cleanup.bind_enabled_from(app_state, 'is_idle')
+                    btn_stop_cleanup.bind_enabled_from(app_state, 'is_running')
+
+        def on_tab_change(e):
+            # The event value is the tab name (or element); anything that is
+            # not the deploy tab means the user opened the cleanup tab
+            if not cleanup_built and e.value not in (tab_deploy, 'Install/Update'):
+                build_cleanup_tab()
+
+        tabs.on_value_change(on_tab_change)
@@ -1,39 +1,53 @@
 from nicegui import ui
+import functools
 from reef.manager.core import BASE_DIR
 from reef.manager.ui_utils import page_header
 
+def _read_doc(path):
+    """Read a documentation file, cached against its mtime across page visits."""
+    return _read_doc_cached(str(path), path.stat().st_mtime_ns)
+
+@functools.lru_cache(maxsize=16)
+def _read_doc_cached(path_str, mtime_ns):
+    with open(path_str, 'r', encoding='utf-8') as fh:
+        return fh.read()
+
 def show_documentation():
     page_header("Documentation", "Guides and References")
-    
+
     docs_dir = BASE_DIR / "docs"
-    
+
     # Simple ToC or just list files
     if docs_dir.exists():
         files = sorted(list(docs_dir.glob("*.md")))
-        
+
+        docs = []
+        readme = BASE_DIR / "README.md"
+        if readme.exists():
+            docs.append(("README", readme))
+        docs.extend((f.stem, f) for f in files)
+
+        # All documents are rendered once per visit and kept in the DOM;
+        # navigation just flips visibility instead of re-parsing Markdown
+        panels = {}
+
+        def select_doc(name):
+            for n, panel in panels.items():
+                panel.set_visibility(n == name)
+
         with ui.row().classes('w-full h-full'):
             # Sidebar for files
             with ui.column().classes('w-1/4 pr-4 border-r border-white/10'):
                 ui.label("Files").classes('font-bold text-slate-400 mb-2')
-                
-                selected_content = ui.markdown().classes('w-full')
-                
-                # Default to README if exists
-                readme = BASE_DIR / "README.md"
-                if readme.exists():
-                     selected_content.content = readme.read_text()
-
-                def load_doc(path):
-                    selected_content.content = path.read_text()
-
-                if readme.exists():
-                    ui.button("README", on_click=lambda p=readme: load_doc(p)).props('flat').classes('text-left w-full text-slate-300')
-
-                for f in files:
-                    ui.button(f.stem, on_click=lambda p=f: load_doc(p)).props('flat').classes('text-left w-full text-slate-300')
-            
+
+                for name, path in docs:
+                    ui.button(name, on_click=lambda n=name: select_doc(n)).props('flat').classes('text-left w-full text-slate-300')
+
             # Content Area
             with ui.scroll_area().classes('w-3/4 pl-4 h-[calc(100vh-200px)]'):
-                selected_content
+                for name, path in docs:
+                    panel = ui.markdown(_read_doc(path)).classes('w-full')
+                    panel.set_visibility(docs and name == docs[0][0])
+                    panels[name] = panel
     else:
         ui.label("No documentation found.").classes('text-slate-500')
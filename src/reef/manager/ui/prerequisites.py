@@ -2,7 +2,7 @@ from nicegui import ui
 import os
 from datetime import datetime
 from reef.manager.core import ANSIBLE_DIR, HOSTS_INI_FILE, BASE_DIR
-from reef.manager.ui_utils import page_header, card_style, async_run_command, async_run_ansible_playbook
+from reef.manager.ui_utils import page_header, card_style, async_run_command, async_run_ansible_playbook, TASK_RESULT_COLUMNS, TASK_STATUS_SLOT
 
 def show_prerequisites():
     page_header("System Compatibility Check", "Verify if computers are ready for installation")
@@ -31,45 +31,33 @@ def show_prerequisites():
         btn_run.disable()
         
         playbook = ANSIBLE_DIR / "playbooks" / "prerequisites.yml"
-        verbosity_flag = "-vv" if verbose.value else ""
-        
+        verbosity_args = ["-vv"] if verbose.value else []
+
         env = os.environ.copy()
         env["ANSIBLE_CONFIG"] = str(ANSIBLE_DIR / "ansible.cfg")
-        
+
         # Log to file setup
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = BASE_DIR / "logs" / f"prerequisites_{timestamp}.log"
         log_file.parent.mkdir(parents=True, exist_ok=True)
-        
+
         if mode.value == "This Computer":
-            cmd = f"ansible-playbook {playbook} --connection=local -i localhost, {verbosity_flag}"
+            cmd = ['ansible-playbook', str(playbook), '--connection=local', '-i', 'localhost,', *verbosity_args]
         else:
             if not HOSTS_INI_FILE.exists():
                 ui.notify(f"Inventory file not found at {HOSTS_INI_FILE}", type='negative')
                 btn_run.enable()
                 return
-            cmd = f"ansible-playbook {playbook} -i {HOSTS_INI_FILE} {verbosity_flag}"
-            
-        ret_code, full_output, task_results = await async_run_ansible_playbook(cmd, log_view)
+            cmd = ['ansible-playbook', str(playbook), '-i', str(HOSTS_INI_FILE), *verbosity_args]
+
+        ret_code, task_results, _ = await async_run_ansible_playbook(cmd, log_view)
         
         # Render Results Table
         if task_results:
              with results_container:
                 ui.label("Check Results").classes('text-lg font-bold text-slate-200 mb-2')
-                
-                cols = [
-                    {'name': 'host', 'label': 'Computer', 'field': 'host', 'align': 'left'},
-                    {'name': 'task', 'label': 'Action', 'field': 'task', 'align': 'left'},
-                    {'name': 'status', 'label': 'Result', 'field': 'status', 'align': 'left'},
-                ]
-                
-                table = ui.table(columns=cols, rows=task_results, row_key='task').classes('w-full')
-                table.add_slot('body-cell-status', '''
-                    <q-td :props="props">
-                        <q-badge :color="props.value === 'ok' ? 'green' : (props.value === 'changed' ? 'amber' : 'red')" text-color="black">
-                            {{ props.value }}
-                        </q-badge>
-                    </q-td>
-                ''')
+
+                table = ui.table(columns=TASK_RESULT_COLUMNS, rows=task_results, row_key='task').classes('w-full')
+                table.add_slot('body-cell-status', TASK_STATUS_SLOT)
 
         btn_run.enable()
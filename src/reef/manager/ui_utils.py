@@ -1,91 +1,275 @@
 from nicegui import ui
 import asyncio
+import functools
+import re
 import subprocess
 import os
 import signal
+import weakref
 from reef.manager.core import BASE_DIR, ANSIBLE_DIR
 
 class AppState:
-    running_process: str = None
     current_process: asyncio.subprocess.Process = None
 
-    def cancel_process(self):
-        if self.current_process:
+    def __init__(self):
+        self._running_process = None
+        # Plain booleans recomputed on assignment, so buttons can bind to
+        # them directly instead of running a lambda on every state tick
+        self.is_idle = True
+        self.is_running = False
+        # Set on every state change so status watchers can sleep until
+        # something actually happens instead of polling
+        self.changed = asyncio.Event()
+
+    @property
+    def running_process(self) -> str:
+        return self._running_process
+
+    @running_process.setter
+    def running_process(self, value):
+        self._running_process = value
+        self.is_idle = value is None
+        self.is_running = value is not None
+        self.changed.set()
+
+    async def cancel_process(self):
+        process = self.current_process
+        if not process:
+            return
+        try:
+            # Send SIGTERM to the process group to kill shell and children
+            pgid = os.getpgid(process.pid)
+            os.killpg(pgid, signal.SIGTERM)
+            self.running_process = "Stopping..."
+        except Exception as e:
+            print(f"Error terminating process: {e}")
+            return
+        try:
+            # Ansible workers may ignore SIGTERM for a while; escalate so
+            # cancellation completes in bounded time
+            await asyncio.wait_for(process.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
             try:
-                # Send SIGTERM to the process group to kill shell and children
-                os.killpg(os.getpgid(self.current_process.pid), signal.SIGTERM)
-                self.running_process = "Stopping..."
-            except Exception as e:
-                print(f"Error terminating process: {e}")
+                os.killpg(pgid, signal.SIGKILL)
+            except Exception:
+                pass # Group exited between the timeout and the kill
 
 app_state = AppState()
 
+# Admin credentials as echoed by the wazuh-indexer role; matched per line
+# while output streams so the full playbook log never needs to be retained
+_ADMIN_PW_RE = re.compile(r'"admin",\s+"([^"]+)"')
+
+# Ansible stream parser patterns, compiled once for the whole run
+_TASK_RE = re.compile(r"TASK \[(.*?)\]")
+_STATUS_RE = re.compile(r"(ok|changed|failed|fatal): \[([^\]]+)\]")
+
+# Shared layout for playbook task-result tables (deploy and prerequisites)
+TASK_RESULT_COLUMNS = [
+    {'name': 'host', 'label': 'Computer', 'field': 'host', 'align': 'left'},
+    {'name': 'task', 'label': 'Action', 'field': 'task', 'align': 'left'},
+    {'name': 'status', 'label': 'Result', 'field': 'status', 'align': 'left'},
+]
+
+TASK_STATUS_SLOT = '''
+    <q-td :props="props">
+        <q-badge :color="props.value === 'ok' ? 'green' : (props.value === 'changed' ? 'amber' : 'red')" text-color="black">
+            {{ props.value }}
+        </q-badge>
+    </q-td>
+'''
+
+# Every live page-header badge, weakly referenced so closed pages drop out
+# on their own; one shared watcher task updates all of them
+_STATUS_BADGES = weakref.WeakSet()
+_status_watcher = None
+
+def _update_badge(badge):
+    if app_state.running_process:
+        badge.classes(remove='hidden')
+        badge.status_label.text = app_state.running_process
+    else:
+        badge.classes(add='hidden')
+
+async def _watch_status():
+    # Event-driven: wakes only when running_process changes instead of
+    # polling, and serves every open page from a single task
+    while True:
+        await app_state.changed.wait()
+        app_state.changed.clear()
+        for badge in list(_STATUS_BADGES):
+            try:
+                _update_badge(badge)
+            except Exception:
+                _STATUS_BADGES.discard(badge) # Client gone after navigation
+
 def page_header(title: str, subtitle: str = None):
+    global _status_watcher
+
     with ui.row().classes('w-full justify-between items-center mb-6'):
         with ui.column():
             ui.label(title).classes('text-3xl font-bold text-white tracking-tight')
             if subtitle:
                 ui.label(subtitle).classes('text-lg text-slate-400')
-        
+
         # Process Status Indicator
         with ui.row().classes('items-center gap-3 bg-indigo-500/10 border border-indigo-500/20 px-4 py-2 rounded-full hidden') as status_badge:
             ui.spinner('dots', size='md').classes('text-indigo-400')
-            status_label = ui.label('Processing...').classes('text-indigo-300 font-bold animate-pulse')
-            
-            def update_status():
-                if app_state.running_process:
-                    status_badge.classes(remove='hidden')
-                    status_label.text = app_state.running_process
-                else:
-                    status_badge.classes(add='hidden')
-            
-            ui.timer(0.5, update_status)
+            status_badge.status_label = ui.label('Processing...').classes('text-indigo-300 font-bold animate-pulse')
+
+        _update_badge(status_badge)
+        _STATUS_BADGES.add(status_badge)
+        if _status_watcher is None or _status_watcher.done():
+            _status_watcher = asyncio.get_event_loop().create_task(_watch_status())
 
     ui.separator().classes('mb-6 bg-slate-700')
 
+class BatchedLog:
+    """
+    Coalescing wrapper around a ui.log element.
+
+    Buffers pushed lines and flushes them as one frame at most every
+    `interval` seconds, and caps retained lines at `cap` (drop-oldest) so
+    verbose playbook runs don't send one websocket message per line or
+    grow the browser DOM unboundedly.
+    """
+
+    def __init__(self, widget, interval=0.1, cap=2000):
+        self.widget = widget
+        self.interval = interval
+        self.cap = cap
+        self._buf = []
+        self._handle = None
+        self._pushed = 0
+
+    def push(self, line):
+        self._buf.append(line)
+        if self._handle is None:
+            self._handle = asyncio.get_event_loop().call_later(self.interval, self.flush)
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._buf:
+            return
+        lines = self._buf
+        self._buf = []
+        self._pushed += len(lines)
+        try:
+            if self._pushed > self.cap:
+                self.widget.clear()
+                self._pushed = len(lines)
+            self.widget.push('\n'.join(lines))
+        except:
+            pass # UI element might be gone if user navigated away
+
+    def clear(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._buf = []
+        self._pushed = 0
+        try:
+            self.widget.clear()
+        except:
+            pass
+
+@functools.cache
 def card_style():
-    return 'p-6 rounded-2xl bg-white/5 border border-white/10 shadow-lg backdrop-blur-md transition-all hover:-translate-y-1 hover:shadow-2xl'
+    return 'reef-card p-6 rounded-2xl bg-white/5 border border-white/10 shadow-lg backdrop-blur-md transition-all hover:-translate-y-1 hover:shadow-2xl'
 
-def _get_ansible_env():
-    env = os.environ.copy()
-    env['ANSIBLE_CONFIG'] = str(BASE_DIR / "ansible.cfg")
-    env['ANSIBLE_ROLES_PATH'] = str(ANSIBLE_DIR / "roles")
+# Built once: the base subprocess environment only depends on the process
+# environment and two constant paths, so no need to re-copy os.environ on
+# every command launch
+_ANSIBLE_ENV_BASE = None
+
+def _get_ansible_env(extra_env=None):
+    global _ANSIBLE_ENV_BASE
+    if _ANSIBLE_ENV_BASE is None:
+        env = os.environ.copy()
+        env['ANSIBLE_CONFIG'] = str(BASE_DIR / "ansible.cfg")
+        env['ANSIBLE_ROLES_PATH'] = str(ANSIBLE_DIR / "roles")
+        _ANSIBLE_ENV_BASE = env
+    if not extra_env:
+        # Callers only hand this to create_subprocess_exec, which copies it,
+        # so the shared dict can be returned as-is
+        return _ANSIBLE_ENV_BASE
+    env = dict(_ANSIBLE_ENV_BASE)
+    env.update(extra_env)
     return env
 
-async def async_run_command(command: str, log_element: ui.log, on_complete=None):
+async def async_run_command(command: list, log_element: ui.log, on_complete=None, extra_env=None):
     """
-    Asynchronously run a shell command and stream output to a UI log element.
+    Asynchronously run a command (argv list) and stream output to a UI log element.
+    Launched directly with exec — no intermediate shell, no quoting pitfalls.
     """
     app_state.running_process = " Running..."
+
+    # One liveness flag instead of a try/except around every push: after the
+    # first failed push (user navigated away) further pushes are no-ops
+    log_alive = True
+
+    def safe_push(text):
+        nonlocal log_alive
+        if not log_alive:
+            return
+        try:
+            log_element.push(text)
+        except Exception:
+            log_alive = False
+
+    safe_push(f"Running: {' '.join(command)}")
+
     try:
-        log_element.push(f"Running: {command}")
-    except:
-        pass
-    
-    try:
-        process = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            executable='/bin/bash',
-            cwd=str(BASE_DIR),
-            env=_get_ansible_env(),
-            preexec_fn=os.setsid # Allow killing whole process group
-        )
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=str(BASE_DIR),
+                env=_get_ansible_env(extra_env),
+                # 1 MiB StreamReader buffer: ansible can emit long recap lines in
+                # bursts, and the default 64 KiB limit would raise LimitOverrunError
+                # and force tiny reads
+                limit=1 << 20,
+                preexec_fn=os.setsid # Allow killing whole process group
+            )
+        except OSError as e:
+            # exec surfaces a missing/unrunnable binary as an exception, not
+            # an exit code like the shell did — report it the same way
+            safe_push(f"Failed to start '{command[0]}': {e}")
+            if hasattr(log_element, 'flush'):
+                log_element.flush()
+            try:
+                ui.notify(f"Failed to start '{command[0]}': {e}", type='negative')
+            except:
+                pass
+            if on_complete:
+                on_complete(127)
+            return
         app_state.current_process = process
 
+        # Chunked reads: one buffer copy per 64 KiB instead of per line
+        buf = b''
         while True:
-            line = await process.stdout.readline()
-            if not line:
+            chunk = await process.stdout.read(65536)
+            if not chunk:
                 break
-            text = line.decode().strip()
-            try:
-                log_element.push(text)
-            except:
-                pass # UI element might be gone if user navigated away
+            buf += chunk
+            *lines, buf = buf.split(b'\n')
+            if lines and log_alive:
+                # One push per chunk: one websocket message for many lines;
+                # nothing here needs the text once the log is gone
+                safe_push('\n'.join(raw.decode().strip() for raw in lines))
+        if buf and log_alive:
+            safe_push(buf.decode().strip())
 
         await process.wait()
-        
+
+        if hasattr(log_element, 'flush'):
+            log_element.flush()
+
         try:
             if process.returncode == 0:
                 ui.notify('Command completed successfully', type='positive')
@@ -103,73 +287,124 @@ async def async_run_command(command: str, log_element: ui.log, on_complete=None)
         app_state.running_process = None
         app_state.current_process = None
 
-async def async_run_ansible_playbook(command: str, log_element: ui.log):
+async def async_run_ansible_playbook(command: list, log_element: ui.log, on_task_result=None, extra_env=None):
     """
-    Runs an ansible playbook, streams output to log, and returns parsed task results.
-    Returns: (returncode, full_output_string, task_results_list)
+    Runs an ansible playbook (argv list), streams output to log, and returns parsed task results.
+    If on_task_result is given it is called with each result dict as soon as the
+    corresponding output line is parsed, so callers can render progress live
+    instead of waiting for the playbook to finish. The admin password is
+    likewise captured from the stream, so the full output never needs to be
+    accumulated in memory.
+    Returns: (returncode, task_results_list, admin_password_or_None)
     """
-    import re
-    import signal
     app_state.running_process = "Running Playbook..."
+
+    # One liveness flag instead of a try/except around every push: after the
+    # first failed push (user navigated away) further pushes are no-ops
+    log_alive = True
+
+    def safe_push(text):
+        nonlocal log_alive
+        if not log_alive:
+            return
+        try:
+            log_element.push(text)
+        except Exception:
+            log_alive = False
+
     try:
         log_element.clear()
-        log_element.push(f"Running: {command}")
-    except:
-        pass
-    
-    captured_lines = []
+    except Exception:
+        log_alive = False
+    safe_push(f"Running: {' '.join(command)}")
+
     task_results = []
-    
+    admin_password = None
+    process = None
+
     try:
-        process = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            executable='/bin/bash',
-            cwd=str(BASE_DIR),
-            env=_get_ansible_env(),
-            preexec_fn=os.setsid # Allow killing whole process group
-        )
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=str(BASE_DIR),
+                env=_get_ansible_env(extra_env),
+                # 1 MiB StreamReader buffer: ansible can emit long recap lines in
+                # bursts, and the default 64 KiB limit would raise LimitOverrunError
+                # and force tiny reads
+                limit=1 << 20,
+                preexec_fn=os.setsid # Allow killing whole process group
+            )
+        except OSError as e:
+            # exec surfaces a missing/unrunnable binary as an exception, not
+            # an exit code like the shell did — report it the same way
+            safe_push(f"Failed to start '{command[0]}': {e}")
+            if hasattr(log_element, 'flush'):
+                log_element.flush()
+            try:
+                ui.notify(f"Failed to start '{command[0]}': {e}", type='negative')
+            except:
+                pass
+            return 127, task_results, admin_password
         app_state.current_process = process
 
         current_task = "Starting"
 
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            text = line.decode().strip()
-            
-            try:
-                log_element.push(text)
-            except:
-                pass
-                
-            captured_lines.append(text)
+        def parse_line(text):
+            nonlocal current_task, admin_password
+
+            if admin_password is None and '"admin"' in text:
+                m_pw = _ADMIN_PW_RE.search(text)
+                if m_pw:
+                    admin_password = m_pw.group(1)
 
             # Parsing Logic
-            if text.startswith("TASK ["):
-                m_task = re.search(r"TASK \[(.*?)\]", text)
-                if m_task:
-                    current_task = m_task.group(1)
-            
-            elif text.startswith("ok: [") or text.startswith("changed: [") or text.startswith("failed: [") or text.startswith("fatal: ["):
-                    parts = text.split("]")
-                    if len(parts) >= 1:
-                        meta = parts[0] # ok: [host
-                        if ": [" in meta:
-                            status_part, host_part = meta.split(": [")
-                            host = host_part.strip()
-                            status = status_part.strip()
-                            
-                            task_results.append({
-                                'host': host,
-                                'task': current_task,
-                                'status': status
-                            })
+            m_task = _TASK_RE.match(text)
+            if m_task:
+                current_task = m_task.group(1)
+                return
+
+            m_status = _STATUS_RE.match(text)
+            if m_status:
+                result = {
+                    'host': m_status.group(2),
+                    'task': current_task,
+                    'status': m_status.group(1)
+                }
+                task_results.append(result)
+                if on_task_result:
+                    try:
+                        on_task_result(result)
+                    except:
+                        pass # UI element might be gone if user navigated away
+
+        # Chunked reads: one buffer copy per 64 KiB instead of per line
+        buf = b''
+        while True:
+            chunk = await process.stdout.read(65536)
+            if not chunk:
+                break
+            buf += chunk
+            *lines, buf = buf.split(b'\n')
+            if lines:
+                texts = [raw.decode().strip() for raw in lines]
+                # One push per chunk: one websocket message for many lines;
+                # skip building the joined frame once the log is gone
+                if log_alive:
+                    safe_push('\n'.join(texts))
+                for text in texts:
+                    parse_line(text)
+        if buf:
+            text = buf.decode().strip()
+            safe_push(text)
+            parse_line(text)
 
         await process.wait()
-        
+
+        if hasattr(log_element, 'flush'):
+            log_element.flush()
+
         try:
             if process.returncode == 0:
                 ui.notify('Playbook completed successfully', type='positive')
@@ -191,7 +426,7 @@ async def async_run_ansible_playbook(command: str, log_element: ui.log):
              except:
                  pass
 
-    return process.returncode, "\n".join(captured_lines), task_results
+    return process.returncode, task_results, admin_password
 
 def status_badge(active: bool, text_active="Active", text_inactive="Inactive"):
     color = "green-400" if active else "amber-400"
@@ -58,6 +58,55 @@ def test_get_inventory_hosts_reads_correctly(mock_ini_file):
         agent2 = next(h for h in hosts if h['ip'] == '10.0.0.2')
         assert agent2['user'] == 'user2'
 
+def test_parse_hosts_ini_sections(mock_ini_file):
+    ini_content = """
+[security_server]
+192.168.1.100 ansible_user=admin
+
+# comment line
+[agents]
+10.0.0.1 ansible_user=user1
+10.0.0.2
+"""
+    mock_ini_file.write_text(ini_content)
+
+    with patch('reef.manager.core.HOSTS_INI_FILE', mock_ini_file):
+        sections = core.parse_hosts_ini()
+
+        assert sections['security_server'] == ['192.168.1.100']
+        assert sections['agents'] == ['10.0.0.1', '10.0.0.2']
+
+def test_parse_hosts_ini_entries_credentials(mock_ini_file):
+    ini_content = """
+[security_server]
+192.168.1.100 ansible_user=admin ansible_password=secret
+
+[agents]
+10.0.0.1 ansible_ssh_private_key_file=/home/user/.ssh/id_rsa
+10.0.0.2
+"""
+    mock_ini_file.write_text(ini_content)
+
+    with patch('reef.manager.core.HOSTS_INI_FILE', mock_ini_file):
+        entries = core.parse_hosts_ini_entries()
+
+        server = entries['security_server'][0]
+        assert server['user'] == 'admin'
+        assert server['password'] == 'secret'
+
+        agent1, agent2 = entries['agents']
+        assert agent1['key'] == '/home/user/.ssh/id_rsa'
+        assert agent2 == {'ip': '10.0.0.2', 'user': 'root', 'password': '', 'key': ''}
+
+def test_parse_hosts_ini_malformed_returns_empty(mock_ini_file):
+    # Content before the first section header raises in configparser;
+    # the wrappers must degrade to an empty inventory, not crash the UI
+    mock_ini_file.write_text("stray line without a section\n[agents]\n10.0.0.1\n")
+
+    with patch('reef.manager.core.HOSTS_INI_FILE', mock_ini_file):
+        assert core.parse_hosts_ini() == {}
+        assert core.parse_hosts_ini_entries() == {}
+
 def test_update_ini_inventory_rewrites_existing(mock_ini_file):
     # Create initial file
     mock_ini_file.write_text("[agents]\n1.1.1.1 = ansible_user=old")
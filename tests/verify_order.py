@@ -17,22 +17,26 @@ def verify_ansible_logic():
         ['wazuh-dashboard', 'wazuh-indexer', 'wazuh-server'] # Reverse typical order
     ]
 
+    # One lookup table instead of a list scan per role
+    order_index = {r: i for i, r in enumerate(static_order)}
+
     print("Verifying Ansible Execution Order Logic...\n")
-    
+
     for i, enabled_roles in enumerate(user_input_scenarios):
         print(f"Scenario {i+1}: User selected: {enabled_roles}")
+        enabled_set = set(enabled_roles)
         executed_order = []
-        
+
         # Simulate Ansible Loop
         for role_item in static_order:
-            if role_item in enabled_roles:
+            if role_item in enabled_set:
                 executed_order.append(role_item)
-                
+
         print(f"  -> Actual Execution Order: {executed_order}")
-        
+
         # Verify order is monotonic with respect to static_order
         # i.e. indices in static_order must be increasing
-        indices = [static_order.index(r) for r in executed_order]
+        indices = [order_index[r] for r in executed_order]
         if indices == sorted(indices):
              print("  -> [PASS] Order is preserved correctly.")
         else: